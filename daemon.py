@@ -0,0 +1,60 @@
+import argparse
+import multiprocessing
+import signal
+import sys
+import threading
+from utils.tools import Tools, DEFAULT_PATTERN
+from watchers.watcher_manager import WatcherManager
+
+
+def main():
+    """Point d'entrée sans interface graphique (serveurs) : surveille les dossiers de patterns.json."""
+    parser = argparse.ArgumentParser(description="PDF Splitter - surveillance des dossiers sans interface graphique")
+    parser.add_argument("--all", action="store_true",
+                        help="surveiller aussi les watchers dont le mode automatique est désactivé")
+    parser.add_argument("--watcher", action="append", metavar="ID",
+                        help="ne lancer que ce watcher (option répétable)")
+    args = parser.parse_args()
+
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"[Daemon] Signal {signal.Signals(signum).name} reçu, arrêt en cours...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    manager = WatcherManager()
+    for watcher_id, config in Tools().load_configs().items():
+        if watcher_id == DEFAULT_PATTERN:
+            continue
+        if args.watcher and watcher_id not in args.watcher:
+            continue
+        if not (config.get("auto", False) or args.all):
+            continue
+        if not config.get("input_dir") or not config.get("output_dir"):
+            print(f"[Daemon] ⚠️ Watcher {watcher_id} ignoré : dossier source ou destination manquant")
+            continue
+        watcher = manager.add_watcher(config["input_dir"], config["output_dir"], watcher_id, auto=True)
+        watcher.start()
+        print(f"[Daemon] Watcher {watcher_id} : {watcher.input_dir} -> {watcher.output_dir}")
+
+    if not manager.get_all_watchers():
+        print("[Daemon] ❌ Aucun watcher à lancer.")
+        return 1
+
+    # Attente par intervalles pour que les signaux soient traités rapidement ;
+    # les modifications de patterns.json (recalibrage depuis l'interface) sont appliquées à chaud
+    while not stop_event.wait(1):
+        Tools().check_for_changes()
+
+    # Les traitements en cours se terminent ; les fichiers en attente restent au journal pour le prochain démarrage
+    manager.shutdown(wait=True)
+    print("[Daemon] ✅ Arrêt terminé.")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
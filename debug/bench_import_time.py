@@ -0,0 +1,58 @@
+"""Contrôle du temps d'import au démarrage (python -X importtime).
+
+Importe un module dans un interpréteur neuf et vérifie qu'aucune dépendance lourde
+(OpenCV, scipy, pymupdf, numpy) n'est chargée et que le temps total reste sous le budget.
+Usage : python debug/bench_import_time.py [module] [budget_ms]
+Code de sortie 1 en cas de régression.
+"""
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules dont l'import doit être différé au premier traitement ou à la première calibration
+HEAVY_MODULES = ("cv2", "scipy", "pymupdf", "fitz", "numpy")
+
+
+def import_times(module):
+    """Temps d'import cumulés (µs) par module, lus dans la sortie de -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1])
+        sys.exit(1)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "ihm.main_window"
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 500
+    times = import_times(module)
+    total_ms = times.get(module, 0) / 1000
+    heavy = sorted({name.split(".")[0] for name in times} & set(HEAVY_MODULES))
+
+    print(f"import {module} : {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    for name, cumulative in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if heavy:
+        print(f"❌ Modules lourds importés au démarrage : {', '.join(heavy)}")
+        failed = True
+    if total_ms > budget_ms:
+        print(f"❌ Budget dépassé de {total_ms - budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("✅ Démarrage sans import lourd")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
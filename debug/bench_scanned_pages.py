@@ -0,0 +1,45 @@
+"""Benchmark du mode pages scannées : rendu des coins par MuPDF vs découpe de l'image décodée une fois.
+
+Vérifie que les deux modes donnent les mêmes pages de découpe et mesure le temps par page.
+Le document est rouvert pour chaque mode : le cache d'images de MuPDF ne fausse pas la mesure.
+Usage : python debug/bench_scanned_pages.py [fichier.pdf] [pattern_id]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pymupdf
+from logic.core import PDFProcessor
+from utils.tools import Tools, DEFAULT_PATTERN
+
+
+def measure(pdf_path, pattern_data, scanned_pages):
+    pattern_data = dict(pattern_data, scanned_pages=scanned_pages, cache=False)
+    processor = PDFProcessor(None, None, pattern_id=None, debug=False, pattern_data=pattern_data)
+    doc = pymupdf.open(pdf_path)
+    try:
+        start = time.perf_counter()
+        pages = [i for i in range(len(doc)) if processor.score_page(doc.load_page(i))[0]]
+        elapsed = time.perf_counter() - start
+        return pages, elapsed / max(len(doc), 1), processor.stats
+    finally:
+        doc.close()
+
+
+def main():
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "test.pdf")
+    pattern_id = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PATTERN
+    pattern_data = Tools().load_configs(pattern_id)
+    results = {}
+    for scanned_pages in (False, True):
+        pages, per_page, stats = measure(pdf_path, pattern_data, scanned_pages)
+        results[scanned_pages] = pages
+        label = "découpe de l'image" if scanned_pages else "rendu des coins"
+        print(f"{label:<20} {per_page * 1000:8.1f} ms/page  pages {pages}")
+        print(f"{'':<20} {dict(stats)}")
+    print("✅ Mêmes pages de découpe" if results[False] == results[True] else "❌ Pages de découpe différentes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark de l'écriture des segments : boucle page par page vs copie par plage.
+
+Usage : python debug/bench_split_writer.py [nombre_de_pages] [pages_par_segment]
+"""
+import os
+import sys
+import tempfile
+import time
+import pymupdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logic.writer import SplitWriter
+
+
+def build_document(page_count):
+    """Document de test : texte + une image partagée par toutes les pages."""
+    image = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 400, 400), False)
+    image.set_rect(image.irect, (240, 220, 40))
+    image_bytes = image.tobytes("png")
+    doc = pymupdf.open()
+    image_xref = 0
+    for i in range(page_count):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1}\n" + "Lorem ipsum dolor sit amet. " * 20, fontsize=9)
+        image_xref = page.insert_image(pymupdf.Rect(400, 600, 550, 750), stream=image_bytes if not image_xref else None,
+                                       xref=image_xref)
+    return pymupdf.open("pdf", doc.tobytes())
+
+
+def write_per_page(doc, output_dir, segments):
+    """Ancienne écriture : un insert_pdf par page."""
+    for file_idx, (start, end) in enumerate(segments, 1):
+        new_doc = pymupdf.open()
+        for page_num in range(start, end):
+            new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        new_doc.save(os.path.join(output_dir, f"split_{file_idx}.pdf"))
+        new_doc.close()
+
+
+def run(label, write, doc, segments):
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        write(doc, output_dir, segments)
+        elapsed = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+    print(f"{label:<32} {elapsed:8.3f} s {size / 1024:10.0f} Ko")
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    segment_size = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    doc = build_document(page_count)
+    segments = [(start, min(start + segment_size, page_count)) for start in range(0, page_count, segment_size)]
+    print(f"{page_count} pages, {len(segments)} segments")
+
+    run("page par page", write_per_page, doc, segments)
+    for garbage, deflate in ((0, False), (1, False), (3, True)):
+        def write_range(doc, output_dir, segments, garbage=garbage, deflate=deflate):
+            writer = SplitWriter(output_dir, "bench.pdf", garbage=garbage, deflate=deflate)
+            for file_idx, (start, end) in enumerate(segments, 1):
+                writer.write_segment(doc, start, end, file_idx)
+        run(f"plage garbage={garbage} deflate={deflate}", write_range, doc, segments)
+
+
+if __name__ == "__main__":
+    main()
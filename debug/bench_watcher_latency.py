@@ -0,0 +1,66 @@
+"""Benchmark de latence de détection des nouveaux fichiers : inotify vs scrutation.
+
+Mesure le délai entre la fermeture d'un PDF dans le dossier surveillé et sa prise en charge
+par le watcher (avant traitement). Usage : python debug/bench_watcher_latency.py [nombre_de_fichiers]
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.tools import DEFAULT_PATTERN
+from watchers.watcher import Watcher
+
+
+class LatencyWatcher(Watcher):
+    """Watcher qui enregistre l'instant de détection au lieu de traiter le fichier."""
+
+    def __init__(self, input_dir, backend):
+        super().__init__(input_dir, input_dir, id=DEFAULT_PATTERN, auto_mode=True)
+        self.watch_backend = backend
+        self.detected = {}
+        self.event = threading.Event()
+
+    def handle_new_file(self, file_path, copy_complete=False):
+        self.detected[os.path.basename(file_path)] = time.perf_counter()
+        self.event.set()
+
+
+def measure(backend, file_count):
+    input_dir = tempfile.mkdtemp()
+    watcher = LatencyWatcher(input_dir, backend)
+    watcher.start()
+    time.sleep(1)  # Laisser le watcher prendre son instantané initial
+    latencies = []
+    try:
+        for i in range(file_count):
+            name = f"bench_{i}.pdf"
+            watcher.event.clear()
+            with open(os.path.join(input_dir, name), "wb") as file:
+                file.write(b"%PDF-1.4\n" + b"0" * 4096)
+            closed_at = time.perf_counter()
+            if watcher.event.wait(timeout=10) and name in watcher.detected:
+                latencies.append(watcher.detected[name] - closed_at)
+    finally:
+        watcher.stop()
+        shutil.rmtree(input_dir, ignore_errors=True)
+    return latencies
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for backend in ("auto", "polling"):
+        latencies = measure(backend, file_count)
+        if latencies:
+            print(f"{backend:<8} médiane {statistics.median(latencies) * 1000:8.1f} ms"
+                  f"  max {max(latencies) * 1000:8.1f} ms  ({len(latencies)}/{file_count} fichiers)")
+        else:
+            print(f"{backend:<8} aucun fichier détecté")
+
+
+if __name__ == "__main__":
+    main()
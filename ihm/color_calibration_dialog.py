@@ -15,6 +15,7 @@ class ColorCalibrationDialog(QDialog):
     def __init__(self, parent=None, pdf_path="test.pdf", page_number=0, lower=(21, 60, 90), upper=(48, 255, 255)):
         super().__init__(parent)
         self.pdf_path = pdf_path
+        # Lecture classique : un PDF tronqué pendant la calibration ne doit pas faire planter l'interface (mmap)
         self.doc = fitz.open(pdf_path)
         self.page_number = page_number
         self.num_pages = self.doc.page_count
@@ -225,3 +226,8 @@ class ColorCalibrationDialog(QDialog):
 
     def get_range(self):
         return self.lower, self.upper
+
+    def done(self, result):
+        # Libère le PDF dès la fermeture du dialogue
+        self.doc.close()
+        super().done(result)
@@ -4,11 +4,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPen, QColor, QPainter
-import numpy as np
-import cv2
-import pymupdf
 from utils.tools import Tools
-from ihm.color_calibration_dialog import ColorCalibrationDialog  # version complète intégrée
 
 DEFAULT_PATTERN = "DEFAULT"
 
@@ -122,6 +118,8 @@ class DrawPatternDialog(QDialog):
         if not pdf_path:
             return
         try:
+            # Import différé : OpenCV et pymupdf ne sont chargés qu'à la première calibration
+            from ihm.color_calibration_dialog import ColorCalibrationDialog
             dialog = ColorCalibrationDialog(pdf_path=pdf_path, page_number=0,lower=self.color_range.get("lower", None),upper=self.color_range.get("upper", None))
             if dialog.exec_():
                 lower, upper = dialog.get_range()
@@ -160,6 +158,7 @@ class DrawPatternDialog(QDialog):
             self.label.setText("ℹ️ Aucun pattern trouvé")
 
     def get_numpy_contour(self):
+        import numpy as np
         if self.points:
             return np.array(self.points, dtype=np.int32).reshape((-1, 1, 2))
         return None
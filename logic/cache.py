@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from utils.tools import BASE_DIR
+
+# Cache des verdicts de détection, à côté de patterns.json
+CACHE_FILE = os.path.join(BASE_DIR, "assets", "detection_cache.sqlite")
+
+# Version de la logique de détection : à incrémenter à chaque changement qui peut modifier un verdict
+# (rendu des coins, seuils par défaut, chemins rapides...), les verdicts déjà en cache sont alors ignorés
+CACHE_VERSION = 1
+
+
+def config_fingerprint(settings):
+    """Empreinte d'un jeu de paramètres (valeurs résolues, défauts compris) et de CACHE_VERSION."""
+    payload = json.dumps({"version": CACHE_VERSION, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def page_hash(page):
+    """Empreinte du contenu d'une page : flux de contenu, images, XObjects et annotations."""
+    doc = page.parent
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    digest.update(page.read_contents())
+    xrefs = sorted({image[0] for image in page.get_images(full=True)} |
+                   {xobject[0] for xobject in page.get_xobjects()})
+    for xref in xrefs:
+        digest.update(doc.xref_stream_raw(xref) or b"")
+    for annot in page.annots():
+        digest.update(doc.xref_object(annot.xref, compressed=True).encode())
+    return digest.hexdigest()
+
+
+class DetectionCache:
+    """Cache disque (SQLite) des verdicts par page, indexé par empreinte de page + empreinte de configuration.
+
+    La taille est bornée à ``max_entries`` ; les entrées les moins récemment utilisées sont évincées.
+    Les nouveaux verdicts et les dates d'utilisation restent en mémoire jusqu'à ``commit`` qui les écrit
+    en une seule transaction courte : les autres process partageant le fichier ne sont jamais bloqués
+    pendant l'analyse d'un document.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=200000):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Plusieurs process de détection peuvent partager le même fichier ; pas de transaction implicite
+        self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS detections ("
+            "key TEXT PRIMARY KEY, verdict INTEGER NOT NULL, score REAL, last_used REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS detections_last_used ON detections (last_used)")
+        self.pending = {}  # Clé -> (verdict, score) pas encore écrits
+        self.used = {}     # Clé lue dans le cache -> date d'utilisation à enregistrer
+
+    def key(self, page, fingerprint):
+        return hashlib.sha256(f"{page_hash(page)}:{fingerprint}".encode()).hexdigest()
+
+    def get(self, key):
+        """Retourne (verdict, score) ou None si la page n'est pas en cache."""
+        if key in self.pending:
+            return self.pending[key]
+        row = self.connection.execute("SELECT verdict, score FROM detections WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.used[key] = time.time()
+        return bool(row[0]), row[1]
+
+    def put(self, key, verdict, score):
+        self.pending[key] = (bool(verdict), score)
+
+    def commit(self):
+        """Écrit les entrées en attente puis évince les plus anciennes au-delà de ``max_entries``."""
+        if not self.pending and not self.used:
+            return
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO detections (key, verdict, score, last_used) VALUES (?, ?, ?, ?)",
+                [(key, int(verdict), score, now) for key, (verdict, score) in self.pending.items()])
+            self.connection.executemany(
+                "UPDATE detections SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self.used.items()])
+            count = self.connection.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+            if count > self.max_entries:
+                self.connection.execute(
+                    "DELETE FROM detections WHERE key IN (SELECT key FROM detections ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.pending.clear()
+        self.used.clear()
+
+    def close(self):
+        self.commit()
+        self.connection.close()
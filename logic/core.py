@@ -1,16 +1,133 @@
+import multiprocessing
 import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import pymupdf
 import cv2
 import numpy as np
-from scipy.spatial.distance import directed_hausdorff
-from utils.tools import Tools
+from logic.cache import DetectionCache, config_fingerprint
+from logic.pattern import PatternTemplate
+from logic.reader import MappedPDF
+from logic.writer import SplitWriter
+from utils.tools import Tools, file_hash, list_pdfs
+
+# Zones de détection : coin de la page, taille du carré (pt) et résolution du rendu complet
+DETECTION_REGIONS = [
+    {"corner": "top_right", "size": 100, "dpi": 300},
+    {"corner": "bottom_left", "size": 100, "dpi": 144},
+]
+
+# Chemins rapides essayés dans l'ordre avant la rastérisation des coins ("fast_paths") :
+# nom -> méthode du processeur retournant True / False, ou None si elle ne tranche pas
+FAST_PATH_METHODS = {
+    "annotations": "detect_annotations",
+    "drawings": "detect_drawings",
+}
+# "drawings" (tracés vectoriels) est à activer explicitement : coûteux sur les pages très vectorielles
+FAST_PATHS = ["annotations"]
+# Types d'annotations PDF considérés comme une marque de séparation
+ANNOTATION_TYPES = ["Highlight", "Ink"]
+
+# Facteurs de réduction du décodage JPEG par OpenCV (décodage à 1/2, 1/4, 1/8 de la résolution)
+JPEG_REDUCTIONS = [(8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                   (2, cv2.IMREAD_REDUCED_COLOR_2), (1, cv2.IMREAD_COLOR)]
+# Part minimale de la page couverte par l'image pour la considérer comme un scan pleine page
+SCAN_MIN_COVERAGE = 0.95
+
+# Nombre de points échantillonnés sur chaque courbe de Bézier d'un tracé vectoriel
+BEZIER_SAMPLES = np.linspace(0., 1., 8)[:, None]
+
+# Élément structurant de l'affinage des contours
+THIN_KERNEL = np.ones((3, 3), np.uint8)
+
+
+def region_rect(page_rect, region):
+    """Calcule le rectangle de découpe d'une zone de détection sur la page."""
+    size = region["size"]
+    if region["corner"] == "top_right":
+        return pymupdf.Rect(page_rect.width - size, 0, page_rect.width, size)
+    if region["corner"] == "bottom_left":
+        return pymupdf.Rect(0, page_rect.height - size, size, page_rect.height)
+    raise ValueError(f"Coin de détection inconnu : {region['corner']}")
+
+
+def process_pool(workers):
+    """Pool de process sûr quel que soit l'appelant.
+
+    L'interface Qt et les watchers ont des threads en cours : leurs pools démarrent par spawn.
+    Un process de pool n'a qu'un thread et peut être dupliqué par fork, bien plus rapide
+    (pas de réimport d'OpenCV / pymupdf) pour la détection parallèle des pages d'un fichier.
+    """
+    method = "spawn"
+    if multiprocessing.parent_process() is not None and "fork" in multiprocessing.get_all_start_methods():
+        method = "fork"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def detect_pages_worker(pdf_path, pattern_data, page_indices):
+    """Point d'entrée d'un process de détection : ouvre le document une seule fois
+    et retourne les indices de pages contenant un surligneur parmi ``page_indices``,
+    ainsi que les statistiques de détection du process."""
+    processor = PDFProcessor(None, None, pattern_id=None, debug=False, pattern_data=pattern_data)
+    # Projection mémoire : tous les process de détection partagent les pages du fichier
+    source = MappedPDF(pdf_path, processor.use_mmap)
+    try:
+        indices = [i for i in page_indices if processor.detect_page(source.doc.load_page(i))]
+        return indices, processor.stats
+    finally:
+        source.close()
+        processor.close_cache()
+
+
+# Processeurs des process du pool partagé, par empreinte de configuration : le motif précalculé
+# et la connexion au cache sont réutilisés d'un fichier à l'autre
+JOB_PROCESSORS = {}
+JOB_PROCESSORS_MAX = 8  # Configurations gardées par process (rechargements à chaud successifs)
+
+
+def split_pdf_job(pattern_data, pdf_path, output_dir, workers=1):
+    """Point d'entrée d'un process du pool partagé des watchers : découpe un fichier complet
+    et retourne (segments écrits, empreinte SHA-256 du fichier source).
+
+    ``workers`` : process de détection des pages accordés par la file (cœurs inoccupés), borné
+    par le ``workers`` du pattern ; 1 quand le pool est déjà occupé par d'autres fichiers.
+    """
+    key = config_fingerprint(pattern_data)
+    processor = JOB_PROCESSORS.get(key)
+    if processor is None:
+        if len(JOB_PROCESSORS) >= JOB_PROCESSORS_MAX:
+            # Configuration la plus ancienne : remplacée depuis par un rechargement
+            JOB_PROCESSORS.pop(next(iter(JOB_PROCESSORS))).close_cache()
+        processor = PDFProcessor(None, None, pattern_id=None, debug=False, pattern_data=pattern_data)
+        JOB_PROCESSORS[key] = processor
+    processor.workers = max(1, min(workers, int(pattern_data.get("workers", 1))))
+    source_hash = file_hash(pdf_path)
+    processor.split_pdf(pdf_path, output_dir)
+    return processor.last_outputs, source_hash
+
 
 class PDFProcessor:
     """Classe gérant le traitement des PDF : découpage et détection de surlignage."""
 
-    def __init__(self, input_dir, output_dir, pattern_id, debug):
+    def __init__(self, input_dir, output_dir, pattern_id, debug, pattern_data=None):
         self.debug = debug
-        pattern_data = Tools().load_configs(pattern_id) or {}
+        if pattern_data is None:
+            pattern_data = Tools().load_configs(pattern_id) or {}
+        self.configure(pattern_data)
+        self.stats = Counter()
+        self.cache = None  # Cache disque des verdicts par page (ouvert au premier usage)
+        self.last_score = None
+        self.last_outputs = []  # Segments écrits par le dernier split_pdf
+        # Tampons HSV / masque réutilisés d'une page à l'autre, par taille de découpe
+        self.buffers = {}
+
+    def configure(self, pattern_data):
+        """Applique une configuration de pattern : motif, plage de couleur, seuils et options.
+
+        Appelée à la construction et à chaque modification de patterns.json (rechargement à chaud) ;
+        le motif précalculé et l'empreinte du cache sont reconstruits, les statistiques conservées.
+        """
+        self.pattern_data = pattern_data
 
         # Valeurs par défaut si absentes
         self.pattern = pattern_data.get("motif", [])
@@ -18,36 +135,112 @@ class PDFProcessor:
         self.input_dir = pattern_data.get("input_dir", "")
         self.output_dir = pattern_data.get("output_dir", "")
         self.color_range = pattern_data.get("color_range", {"lower": [21, 60, 90], "upper": [48, 255, 255]})
+        self.lower_color = np.array(self.color_range["lower"], dtype=np.uint8)
+        self.upper_color = np.array(self.color_range["upper"], dtype=np.uint8)
+        self.color_verdicts = {}  # Couleur RGB -> dans la plage ou non (chemins rapides)
+        # Motif précalculé une fois pour toutes les pages et tous les fichiers
+        self.template = PatternTemplate(self.pattern)
+        # Nombre de process pour la détection parallèle des pages (1 = traitement séquentiel)
+        self.workers = max(1, int(pattern_data.get("workers", 1)))
+        # Nombre de fichiers traités en parallèle par un lancement manuel (1 = un fichier après l'autre)
+        self.backlog_workers = max(1, int(pattern_data.get("backlog_workers", 1)))
+        # Options d'enregistrement des PDF découpés
+        self.save_garbage = pattern_data.get("save_garbage", 0)
+        self.save_deflate = pattern_data.get("save_deflate", False)
+        # Ordre de traitement des fichiers déjà présents : "age" (plus ancien d'abord) ou "size"
+        self.backlog_order = pattern_data.get("backlog_order", "age")
+        # Mode flux pour les très gros PDF (segments écrits au fil de l'eau)
+        self.streaming = pattern_data.get("streaming", False)
+        self.store_shrink_every = pattern_data.get("store_shrink_every", 50)
+        # Ouverture des PDF source par projection mémoire (mmap) plutôt que par lecture du fichier.
+        # Désactivée par défaut : un fichier tronqué pendant la lecture tue le process (SIGBUS)
+        self.use_mmap = pattern_data.get("mmap_input", False)
+
+        # Cascade : vignette basse résolution des coins avant le rendu pleine résolution
+        self.cascade = pattern_data.get("cascade", False)
+        self.cascade_dpi = pattern_data.get("cascade_dpi", 36)
+        self.cascade_min_pixels = pattern_data.get("cascade_min_pixels", 3)
+        # Nombre minimal de pixels dans la plage de couleur pour lancer la recherche de contours
+        self.min_color_pixels = pattern_data.get("min_color_pixels", 50)
+        # Distance de Hausdorff maximale (contours normalisés) pour accepter une forme
+        self.hausdorff_threshold = pattern_data.get("hausdorff_threshold", 0.40)
+        self.regions = pattern_data.get("regions", DETECTION_REGIONS)
+        # Pages scannées (une seule image pleine page) : image décodée une fois, coins découpés en numpy
+        self.scanned_pages = pattern_data.get("scanned_pages", False)
+        self.fast_paths = pattern_data.get("fast_paths", FAST_PATHS)
+        for name in self.fast_paths:
+            if name not in FAST_PATH_METHODS:
+                raise ValueError(f"Chemin rapide de détection inconnu : {name}")
+        self.annotation_types = set(pattern_data.get("annotation_types", ANNOTATION_TYPES))
+        # Cache disque des verdicts par page ; l'empreinte change avec le motif et les seuils
+        self.use_cache = pattern_data.get("cache", True)
+        self.cache_max_entries = pattern_data.get("cache_max_entries", 200000)
+        self.fingerprint = config_fingerprint(self.detection_settings())
+
+    def detection_settings(self):
+        """Paramètres résolus (valeurs par défaut comprises) dont dépend le verdict d'une page."""
+        return {
+            "motif": self.template.points.tolist(),
+            "color_range": [self.lower_color.tolist(), self.upper_color.tolist()],
+            "regions": self.regions,
+            "cascade": [self.cascade, self.cascade_dpi, self.cascade_min_pixels] if self.cascade else False,
+            "min_color_pixels": self.min_color_pixels,
+            "hausdorff_threshold": self.hausdorff_threshold,
+            "fast_paths": list(self.fast_paths),
+            "annotation_types": sorted(self.annotation_types),
+            "scanned_pages": bool(self.scanned_pages),
+        }
 
     def process(self):
-        """Lance le traitement sur tous les fichiers PDF du dossier source."""
-        for filename in os.listdir(self.input_dir):
-            if filename.lower().endswith(".pdf"):
-                pdf_path = os.path.join(self.input_dir, filename)
+        """Lance le traitement sur tous les fichiers PDF du dossier source.
+
+        Les fichiers sont pris dans l'ordre ``backlog_order`` ; avec ``backlog_workers`` > 1 et
+        plusieurs fichiers, ils sont répartis sur un pool de process (un fichier par process) et
+        les cœurs restants servent à la détection parallèle des pages (``workers``).
+        """
+        pdf_paths = list_pdfs(self.input_dir, self.backlog_order)
+        file_workers = min(self.backlog_workers, len(pdf_paths))
+        if file_workers <= 1 or self.debug:
+            for pdf_path in pdf_paths:
                 try:
                     success = self.split_pdf(pdf_path, self.output_dir)
-                    if success and self.delete_source:
-                        os.remove(pdf_path)
-                        print(f" Fichier source supprimé : {pdf_path}")
+                    self.after_processing(pdf_path, success)
+                except Exception as e:
+                    print(f" Erreur lors du traitement : {e}")
+            return
+
+        page_workers = max(1, (os.cpu_count() or 1) // file_workers)
+        with process_pool(file_workers) as executor:
+            futures = {executor.submit(split_pdf_job, self.pattern_data, pdf_path, self.output_dir, page_workers): pdf_path
+                       for pdf_path in pdf_paths}
+            for future, pdf_path in futures.items():
+                try:
+                    outputs, _ = future.result()
+                    self.after_processing(pdf_path, outputs)
                 except Exception as e:
-                    # Supprimer le fichier source si l'option est activée
                     print(f" Erreur lors du traitement : {e}")
 
+    def after_processing(self, pdf_path, success):
+        """Supprime le fichier source après un découpage réussi si l'option est activée."""
+        if success and self.delete_source:
+            os.remove(pdf_path)
+            print(f" Fichier source supprimé : {pdf_path}")
 
-    def split_pdf(self, pdf_path, output_dir):
-        doc = pymupdf.open(pdf_path)
 
+    def split_pdf(self, pdf_path, output_dir):
+        self.last_outputs = []
+        # Fermé (projection comprise) avant une éventuelle suppression du fichier source
+        with MappedPDF(pdf_path, self.use_mmap) as doc:
+            if self.streaming:
+                return self.split_pdf_streaming(doc, pdf_path, output_dir)
+            return self.split_pdf_batch(doc, pdf_path, output_dir)
+
+    def split_pdf_batch(self, doc, pdf_path, output_dir):
+        """Détecte toutes les pages (éventuellement en parallèle) puis écrit les segments."""
         # Indices où découper le PDF (pages contenant un surligneur)
-        split_indices = []
-        for i in range(len(doc)):
-            page = doc.load_page(i)
-            mat = pymupdf.Matrix(2, 2)
-            rect = page.rect
-            clip_top_right = pymupdf.Rect(rect.width - 100, 0, rect.width, 100)
-            clip_bas_left = pymupdf.Rect(0, rect.height - 100, 100, rect.height)
-            if self.detect_highlighter(page.get_pixmap(alpha=False, dpi=300, matrix=mat, clip=clip_top_right), pattern=self.pattern, debug=self.debug) or \
-                    self.detect_highlighter(page.get_pixmap(alpha=False, matrix=mat, clip=clip_bas_left), pattern=self.pattern, debug=self.debug):
-                split_indices.append(i)
+        self.stats = Counter()
+        split_indices = self.find_split_indices(doc, pdf_path)
+        print(f"📊 Statistiques de détection : {dict(self.stats)}")
 
         split_indices = sorted(set(split_indices))
         split_indices.append(len(doc))
@@ -56,43 +249,368 @@ class PDFProcessor:
             print(f"Aucun stabilo détecté, le fichier {pdf_path} ne sera pas découpé.")
             return None
 
+        writer = SplitWriter(output_dir, pdf_path, garbage=self.save_garbage, deflate=self.save_deflate)
+        self.last_outputs = writer.outputs
         file_idx = 1
         start = split_indices[0]
         for end in split_indices[1:]:
             print(f"PDF sera découpé en : {len(split_indices)} ")
             if start < end:
-                new_doc = pymupdf.open()  # Nouveau document PDF
-                for page_num in range(start, end):
-                    new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)  # Ajouter la page au nouveau document
-                output_path = os.path.join(output_dir, f"split_{file_idx}.pdf")
-                new_doc.save(output_path)  # Sauvegarder le nouveau fichier PDF
+                output_path = writer.write_segment(doc, start, end, file_idx)
                 print(f"PDF enregistré: {output_path}")
                 file_idx +=1
                 start = end
         return len(split_indices)-1
 
-    def detect_highlighter(self, image, pattern, debug=True):
+    def split_pdf_streaming(self, doc, pdf_path, output_dir):
+        """Découpage en flux pour les très gros PDF : chaque segment est écrit et fermé dès que
+        la page de début du segment suivant est détectée, la mémoire reste stable quel que soit
+        le nombre de pages. La détection est séquentielle dans ce mode."""
+        self.stats = Counter()
+        writer = SplitWriter(output_dir, pdf_path, garbage=self.save_garbage, deflate=self.save_deflate)
+        self.last_outputs = writer.outputs
+        file_idx = 1
+        start = None
+        for i, page in self.iter_pages(doc):
+            if not self.detect_page(page):
+                continue
+            if start is not None:
+                output_path = writer.write_segment(doc, start, i, file_idx)
+                print(f"PDF enregistré: {output_path}")
+                file_idx += 1
+            start = i
+        if self.cache is not None:
+            self.cache.commit()
+        print(f"📊 Statistiques de détection : {dict(self.stats)}")
+
+        if start is None:
+            print(f"Aucun stabilo détecté, le fichier {pdf_path} ne sera pas découpé.")
+            return None
+
+        # Dernier segment : jusqu'à la fin du document
+        output_path = writer.write_segment(doc, start, len(doc), file_idx)
+        print(f"PDF enregistré: {output_path}")
+        return file_idx
+
+    def iter_pages(self, doc):
+        """Générateur sur les pages du document ; le cache interne de MuPDF est vidé
+        toutes les ``store_shrink_every`` pages pour garder une mémoire constante."""
+        for i in range(len(doc)):
+            page = doc.load_page(i)
+            yield i, page
+            page = None
+            if (i + 1) % self.store_shrink_every == 0:
+                pymupdf.TOOLS.store_shrink(100)
+
+    def find_split_indices(self, doc, pdf_path):
+        """Retourne les indices des pages contenant un surligneur, en séquentiel ou
+        en parallèle selon ``workers`` (le mode debug reste séquentiel)."""
+        page_count = len(doc)
+        workers = min(self.workers, page_count)
+        if workers <= 1 or self.debug:
+            split_indices = [i for i in range(page_count) if self.detect_page(doc.load_page(i))]
+            if self.cache is not None:
+                self.cache.commit()
+            return split_indices
+
+        # Découpage en blocs de pages contigus, un par process
+        chunk_size = -(-page_count // workers)
+        chunks = [range(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        split_indices = []
+        with process_pool(workers) as executor:
+            futures = [executor.submit(detect_pages_worker, pdf_path, self.pattern_data, list(chunk)) for chunk in chunks]
+            for future in futures:
+                indices, stats = future.result()
+                split_indices.extend(indices)
+                self.stats.update(stats)
+        return split_indices
+
+    def detect_page(self, page):
+        """Indique si un surligneur est présent dans l'un des coins de la page,
+        en passant par le cache disque si la page a déjà été analysée avec cette configuration."""
+        self.stats["pages"] += 1
+        if not self.use_cache or self.debug:
+            return self.score_page(page)[0]
+
+        if self.cache is None:
+            self.cache = DetectionCache(max_entries=self.cache_max_entries)
+        key = self.cache.key(page, self.fingerprint)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached[0]
+
+        found, score = self.score_page(page)
+        self.cache.put(key, found, score)
+        return found
+
+    def close_cache(self):
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def score_page(self, page):
+        """Analyse les coins de la page : (surligneur trouvé, meilleure distance de Hausdorff ou None)."""
+        found, best_score = False, None
+        # Marques numériques (annotations...) : verdict sans rastérisation quand c'est possible
+        verdict = self.fast_path_verdict(page)
+        if verdict is not None:
+            return verdict, None
+
+        if self.scanned_pages:
+            crops = self.scanned_crops(page)
+            if crops is not None:
+                self.stats["scanned_pages"] += 1
+                for crop in crops:
+                    found = self.detect_highlighter(crop, pattern=self.pattern, debug=self.debug)
+                    if self.last_score is not None and (best_score is None or self.last_score < best_score):
+                        best_score = self.last_score
+                    if found:
+                        break
+                return found, best_score
+
+        # Le contenu de la page n'est interprété qu'une fois, toutes les zones sont rendues depuis cette liste
+        display_list = page.get_displaylist()
+        regions = self.regions
+        if self.cascade:
+            # Seuls les coins dont la vignette contient assez de couleur sont rendus en pleine résolution
+            regions = [region for region in regions if self.thumbnail_has_color(display_list, page.rect, region)]
+            if not regions:
+                self.stats["cascade_cheap_exit"] += 1
+                return False, None
+
+        for region in regions:
+            self.stats["full_renders"] += 1
+            pix = self.render_region(display_list, page.rect, region, region["dpi"])
+            found = self.detect_highlighter(pix, pattern=self.pattern, debug=self.debug)
+            pix = None  # Libération immédiate du pixmap
+            if self.last_score is not None and (best_score is None or self.last_score < best_score):
+                best_score = self.last_score
+            if found:
+                break
+        display_list = None
+        return found, best_score
+
+    def fast_path_verdict(self, page):
+        """Essaie les chemins rapides de ``fast_paths`` : verdict du premier qui tranche, sinon None."""
+        for name in self.fast_paths:
+            verdict = getattr(self, FAST_PATH_METHODS[name])(page)
+            if verdict is not None:
+                self.stats[f"{name}_fast_path"] += 1
+                return verdict
+        return None
+
+    def detect_annotations(self, page):
+        """Verdict à partir des annotations surligneur / encre présentes dans les coins de détection.
+
+        Vrai si l'une d'elles a une couleur dans ``color_range``, faux si les coins ne contiennent
+        que des annotations d'une autre couleur ; None (rastérisation) sans annotation dans les coins.
+        """
+        if page.first_annot is None:
+            return None
+        rects = [region_rect(page.rect, region) for region in self.regions]
+        found_annotation = False
+        for annot in page.annots():
+            if annot.type[1] not in self.annotation_types:
+                continue
+            # Rectangle de l'annotation dans le repère de la page affichée (comme les zones rendues)
+            annot_rect = annot.rect * page.rotation_matrix
+            if not any(annot_rect.intersects(rect) for rect in rects):
+                continue
+            found_annotation = True
+            if self.color_in_range(annot.colors.get("stroke") or annot.colors.get("fill")):
+                return True
+        return False if found_annotation else None
+
+    def detect_drawings(self, page):
+        """Verdict à partir des tracés vectoriels (encre numérique) présents dans les coins de détection.
+
+        Les tracés dont la couleur est dans ``color_range`` sont comparés directement au motif :
+        vrai si l'un correspond, faux sinon ; None (rastérisation) sans tracé coloré dans les coins.
+        """
+        if not self.template:
+            return None
+        rects = [region_rect(page.rect, region) for region in self.regions]
+        matrix = page.rotation_matrix
+        contours = []
+        for path in page.get_cdrawings():
+            # Filtre par couleur d'abord (verdict mémorisé par couleur) : la géométrie n'est
+            # calculée que pour les rares tracés de la couleur du surligneur
+            color = path.get("color") if "s" in path["type"] else path.get("fill")
+            if not self.color_in_range(color):
+                continue
+            # Coordonnées de la page non tournée -> repère de la page affichée (comme les zones rendues)
+            # élargi de la demi-épaisseur du trait (un trait droit a un rectangle d'aire nulle)
+            margin = (path.get("width") or 1.) / 2
+            path_rect = (pymupdf.Rect(path["rect"]) + (-margin, -margin, margin, margin)) * matrix
+            if not any(path_rect.intersects(rect) for rect in rects):
+                continue
+            points = self.path_points(path, matrix)
+            if len(points) >= 2:
+                contours.append(points)
+        if not contours:
+            return None
+        self.stats["contours_scored"] += len(contours)
+        best_index, _ = self.template.best_match(contours, self.hausdorff_threshold)
+        return best_index is not None
+
+    def path_points(self, path, matrix):
+        """Polyligne (N, 2) d'un tracé de get_cdrawings, courbes de Bézier échantillonnées."""
+        points = []
+        for item in path["items"]:
+            if item[0] == "l":
+                points.extend(item[1:3])
+            elif item[0] == "c":
+                p0, p1, p2, p3 = (np.array(point) for point in item[1:5])
+                t = BEZIER_SAMPLES
+                points.extend((1 - t) ** 3 * p0 + 3 * (1 - t) ** 2 * t * p1 + 3 * (1 - t) * t ** 2 * p2 + t ** 3 * p3)
+            elif item[0] == "re":
+                x0, y0, x1, y1 = item[1]
+                points.extend([(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)])
+            elif item[0] == "qu":
+                ul, ur, ll, lr = item[1]
+                points.extend([ul, ur, lr, ll, ul])
+        points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        return points @ np.array([[matrix.a, matrix.b], [matrix.c, matrix.d]]) + (matrix.e, matrix.f)
+
+    def color_in_range(self, rgb):
+        """Vrai si une couleur PDF (composantes RGB entre 0 et 1) est dans la plage HSV ``color_range``."""
+        if not rgb or len(rgb) != 3:
+            return False  # Sans couleur, ou en niveaux de gris / CMJN
+        rgb = tuple(rgb)
+        verdict = self.color_verdicts.get(rgb)
+        if verdict is None:
+            pixel = np.array([[[round(component * 255) for component in rgb]]], dtype=np.uint8)
+            hsv = cv2.cvtColor(pixel, cv2.COLOR_RGB2HSV)
+            verdict = bool(cv2.inRange(hsv, self.lower_color, self.upper_color)[0, 0])
+            self.color_verdicts[rgb] = verdict
+        return verdict
+
+    def scanned_crops(self, page):
+        """Coins de détection d'une page scannée, découpés dans l'image pleine page décodée une seule fois.
+
+        Retourne une découpe RGB par zone, à la taille qu'aurait le rendu à ``dpi``, ou None si la
+        page n'est pas une image unique couvrant la page sans rotation (rendu classique).
+        """
+        images = page.get_images(full=True)
+        if len(images) != 1 or images[0][1] or page.rotation:
+            return None  # Plusieurs images, masque de transparence ou page tournée
+        # Sans xrefs=True (qui calcule une empreinte de chaque image, donc la décode)
+        infos = page.get_image_info()
+        if len(infos) != 1:
+            return None  # Image placée plusieurs fois
+        transform = infos[0]["transform"]
+        bbox = pymupdf.Rect(infos[0]["bbox"])
+        if transform[1] or transform[2] or transform[0] <= 0 or transform[3] <= 0:
+            return None  # Image tournée ou retournée
+        if abs(bbox & page.rect) < SCAN_MIN_COVERAGE * abs(page.rect):
+            return None
+
+        xref, width = images[0][0], images[0][2]
+        # Plus forte réduction du décodage qui garde la résolution demandée par chaque zone
+        max_dpi = max(region["dpi"] for region in self.regions)
+        image_dpi = width / bbox.width * 72
+        image, bgr = self.decode_scan(page.parent, xref, image_dpi / max_dpi)
+        if image is None:
+            return None
+        scale_x, scale_y = image.shape[1] / bbox.width, image.shape[0] / bbox.height
+
+        crops = []
+        for region in self.regions:
+            rect = region_rect(page.rect, region)
+            x0, x1 = (int(round((x - bbox.x0) * scale_x)) for x in (rect.x0, rect.x1))
+            y0, y1 = (int(round((y - bbox.y0) * scale_y)) for y in (rect.y0, rect.y1))
+            crop = image[max(y0, 0):max(y1, 0), max(x0, 0):max(x1, 0)]
+            if crop.size == 0:
+                return None
+            zoom = region["dpi"] / 72
+            size = (int(round(rect.width * zoom)), int(round(rect.height * zoom)))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+            # Conversion des couleurs sur la seule découpe plutôt que sur toute l'image
+            crops.append(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB) if bgr else crop)
+        return crops
+
+    def decode_scan(self, doc, xref, max_reduction):
+        """Décode l'image d'un scan : JPEG via OpenCV (BGR) à résolution réduite si possible, autres
+        formats (JBIG2, CCITT, Flate, JPX...) via MuPDF (RGB). Retourne (image, ordre BGR) ou (None, False)."""
+        if doc.xref_get_key(xref, "Filter")[1] == "/DCTDecode":
+            extracted = doc.extract_image(xref)
+            if extracted["colorspace"] == 3 and extracted["ext"] == "jpeg":
+                flags = next(flag for factor, flag in JPEG_REDUCTIONS if factor <= max(max_reduction, 1))
+                # Orientation EXIF ignorée : MuPDF affiche l'image telle qu'elle est stockée
+                image = cv2.imdecode(np.frombuffer(extracted["image"], dtype=np.uint8),
+                                     flags | cv2.IMREAD_IGNORE_ORIENTATION)
+                if image is not None:
+                    self.stats["scan_jpeg_decodes"] += 1
+                    return image, True
+        try:
+            pix = pymupdf.Pixmap(doc, xref)
+            if pix.colorspace is None or pix.colorspace.n != 3 or pix.alpha:
+                pix = pymupdf.Pixmap(pymupdf.csRGB, pix, 0)
+        except Exception:
+            return None, False
+        self.stats["scan_pixmap_decodes"] += 1
+        return self.pixmap_to_array(pix).copy(), False
+
+    def render_region(self, display_list, page_rect, region, dpi):
+        """Rastérise une zone de détection depuis la display list de la page."""
+        zoom = dpi / 72
+        return display_list.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False, clip=region_rect(page_rect, region))
+
+    def thumbnail_has_color(self, display_list, page_rect, region):
+        """Rendu basse résolution d'un coin : vrai si assez de pixels sont dans la plage de couleur."""
+        pix = self.render_region(display_list, page_rect, region, self.cascade_dpi)
+        buffers = self.get_buffers(pix.height, pix.width)
+        hsv = cv2.cvtColor(self.pixmap_to_array(pix), cv2.COLOR_RGB2HSV, dst=buffers["hsv"])
+        mask = cv2.inRange(hsv, self.lower_color, self.upper_color, dst=buffers["mask"])
+        return cv2.countNonZero(mask) >= self.cascade_min_pixels
+
+    def pixmap_to_array(self, image):
+        """Vue numpy (sans copie) sur les pixels RGB d'un pixmap."""
         channels = image.n
-        img_np = np.frombuffer(image.samples, dtype=np.uint8)
-        if channels == 4:
-            img_np = img_np.reshape(image.height, image.width, 4)[:, :, :3]
-        elif channels == 3:
-            img_np = img_np.reshape(image.height, image.width, 3)
-        else:
+        if channels not in (3, 4):
             raise ValueError("Format d'image non pris en charge")
+        img_np = np.ndarray((image.height, image.width, channels), dtype=np.uint8,
+                            buffer=image.samples_mv, strides=(image.stride, channels, 1))
+        if channels == 4:
+            img_np = np.ascontiguousarray(img_np[:, :, :3])
+        return img_np
+
+    def get_buffers(self, height, width):
+        """Retourne les tampons HSV / masque / squelette pour une découpe de cette taille,
+        alloués une seule fois par processeur (donc par process de détection)."""
+        buffers = self.buffers.get((height, width))
+        if buffers is None:
+            self.stats["buffer_allocations"] += 1
+            buffers = {
+                "hsv": np.empty((height, width, 3), dtype=np.uint8),
+                "mask": np.empty((height, width), dtype=np.uint8),
+                "thin": np.empty((height, width), dtype=np.uint8),
+            }
+            self.buffers[(height, width)] = buffers
+        return buffers
+
+    def detect_highlighter(self, image, pattern, debug=True):
+        self.last_score = None
+        # Pixmap rendu, ou découpe RGB déjà en tableau numpy (mode pages scannées)
+        img_np = image if isinstance(image, np.ndarray) else self.pixmap_to_array(image)
         if debug:
             img_np = img_np.copy()
+        buffers = self.get_buffers(img_np.shape[0], img_np.shape[1])
 
         # Conversion en HSV et détection du stabilo
-        hsv = cv2.cvtColor(img_np, cv2.COLOR_RGB2HSV)
+        hsv = cv2.cvtColor(img_np, cv2.COLOR_RGB2HSV, dst=buffers["hsv"])
 
         # Plage de couleurs pour le surlignage
-        lowercolor = np.array(self.color_range["lower"], dtype=np.uint8)
-        uppercolor = np.array(self.color_range["upper"], dtype=np.uint8)
-        mask = cv2.inRange(hsv, lowercolor, uppercolor)
+        mask = cv2.inRange(hsv, self.lower_color, self.upper_color, dst=buffers["mask"])
+
+        # Pas assez de couleur : inutile d'extraire et de comparer les contours
+        if not debug and cv2.countNonZero(mask) < self.min_color_pixels:
+            self.stats["color_gate_exit"] += 1
+            return False
 
         # Réduction des contours détectés en lignes minces (squelette)
-        mask = self.thin_contour(mask)
+        mask = self.thin_contour(mask, dst=buffers["thin"])
 
         # Détection des contours après affinage
         contours_detect, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -109,7 +627,7 @@ class PDFProcessor:
 
                 # Affichage du dessin utilisateur en bleu
                 if pattern:
-                    cv2.polylines(temp_overlay, [np.array(pattern)], isClosed=False, color=(255, 0, 0),
+                    cv2.polylines(temp_overlay, [self.template.points], isClosed=False, color=(255, 0, 0),
                                   thickness=2)  # Bleu
 
                 cv2.imshow("Dessinez une forme", temp_overlay)
@@ -120,52 +638,20 @@ class PDFProcessor:
 
             cv2.destroyAllWindows()
 
-        # Comparaison avec la forme dessinée par l'utilisateur
-        if pattern:
-            pattern_np = np.array(pattern, dtype=np.int32).reshape((-1, 1, 2))
-
-            for detected_contour in contours_detect:
-                detected_contour_np = detected_contour.reshape((-1, 2))
-
-                hausdorff, match = self.compare_shapes(pattern_np.reshape((-1, 2)), detected_contour_np)
-                print(f"Distance de Hausdorff: {hausdorff}, Score de similarité OpenCV: {match}")
-
-                if hausdorff < 0.40:  # Seuils ajustables
-                    print("Forme similaire détectée ! ✅")
-                    return True
-                else:
-                    print("Forme différente ❌")
-                    return False
-
-    def hausdorff_distance(self, contour1, contour2):
-        return max(directed_hausdorff(contour1, contour2)[0], directed_hausdorff(contour2, contour1)[0])
-
-    def normalize_contour(self, contour):
-        """Centre et normalise la taille du contour pour comparaison."""
-        contour = np.array(contour, dtype=np.float32).reshape(-1, 2)
-
-        # Centrer autour du centre de gravité
-        centroid = np.mean(contour, axis=0)
-        contour -= centroid
-
-        # Mise à l'échelle pour normaliser la taille
-        max_dist = np.max(np.linalg.norm(contour, axis=1))
-        if max_dist > 0:
-            contour /= max_dist
-
-        return contour
-
-    def compare_shapes(self, contour1, contour2):
-        """Compare deux contours normalisés."""
-        norm_contour1 = self.normalize_contour(contour1)
-        norm_contour2 = self.normalize_contour(contour2)
-
-        hausdorff_dist = self.hausdorff_distance(norm_contour1, norm_contour2)
-        shape_match = cv2.matchShapes(norm_contour1, norm_contour2, cv2.CONTOURS_MATCH_I1, 0)
-
-        return hausdorff_dist, shape_match
-
-    def thin_contour(self, mask):
-        kernel = np.ones((3, 3), np.uint8)
-        thin = cv2.morphologyEx(mask, cv2.MORPH_HITMISS, kernel)
+        # Comparaison de tous les contours avec la forme dessinée par l'utilisateur
+        if pattern and contours_detect:
+            self.stats["contours_scored"] += len(contours_detect)
+            best_index, hausdorff = self.template.best_match(
+                [contour.reshape((-1, 2)) for contour in contours_detect], self.hausdorff_threshold)
+            self.last_score = hausdorff
+            print(f"Distance de Hausdorff du meilleur contour: {hausdorff} ({len(contours_detect)} contours)")
+
+            if best_index is not None:
+                print("Forme similaire détectée ! ✅")
+                return True
+            print("Forme différente ❌")
+        return False
+
+    def thin_contour(self, mask, dst=None):
+        thin = cv2.morphologyEx(mask, cv2.MORPH_HITMISS, THIN_KERNEL, dst=dst)
         return thin
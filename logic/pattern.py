@@ -0,0 +1,129 @@
+import math
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Nombre de points après rééchantillonnage pour le score groupé des contours
+RESAMPLE_POINTS = 64
+# Marge appliquée au seuil pour retenir un contour avant la vérification exacte
+PREFILTER_MARGIN = 1.5
+
+
+def normalize_contour(contour):
+    """Centre et normalise la taille du contour pour comparaison."""
+    contour = np.array(contour, dtype=np.float32).reshape(-1, 2)
+
+    # Centrer autour du centre de gravité
+    centroid = np.mean(contour, axis=0)
+    contour -= centroid
+
+    # Mise à l'échelle pour normaliser la taille
+    max_dist = np.max(np.linalg.norm(contour, axis=1))
+    if max_dist > 0:
+        contour /= max_dist
+
+    return contour
+
+
+def resample_contours(contours, n_points=RESAMPLE_POINTS):
+    """Rééchantillonne chaque contour à ``n_points`` points répartis selon l'abscisse curviligne.
+
+    Tous les contours sont concaténés et interpolés en une seule passe : retourne un
+    tableau (nombre de contours, n_points, 2) en float64.
+    """
+    contours = [np.asarray(c, dtype=np.float64).reshape(-1, 2) for c in contours]
+    sizes = np.array([len(c) for c in contours])
+    points = np.concatenate(contours)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    ends = starts + sizes - 1
+
+    # Abscisse curviligne globale ; un écart arbitraire sépare deux contours successifs
+    steps = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    steps[starts[1:] - 1] = 1.
+    arc = np.concatenate(([0.], np.cumsum(steps)))
+
+    fractions = np.linspace(0., 1., n_points)
+    targets = arc[starts, None] + fractions[None, :] * (arc[ends] - arc[starts])[:, None]
+    x = np.interp(targets.ravel(), arc, points[:, 0])
+    y = np.interp(targets.ravel(), arc, points[:, 1])
+    return np.stack((x, y), axis=1).reshape(len(contours), n_points, 2)
+
+
+def normalize_stacked(contours):
+    """Version groupée de ``normalize_contour`` pour un tableau (N, points, 2)."""
+    contours = contours - contours.mean(axis=1, keepdims=True)
+    max_dist = np.linalg.norm(contours, axis=2).max(axis=1)
+    max_dist[max_dist == 0] = 1.
+    return contours / max_dist[:, None, None]
+
+
+def bounded_directed_hausdorff(tree, points, threshold, chunk_size=512):
+    """Distance de Hausdorff orientée ``points`` -> points de ``tree``, avec arrêt anticipé.
+
+    Les requêtes sont bornées par ``threshold`` et traitées par blocs : dès qu'un point
+    n'a aucun voisin à moins de ``threshold``, la distance dépasse le seuil et on renvoie
+    ``math.inf``. Sinon la valeur retournée est exacte.
+    """
+    distance = 0.
+    for start in range(0, len(points), chunk_size):
+        d, _ = tree.query(points[start:start + chunk_size], distance_upper_bound=threshold)
+        chunk_max = d.max()
+        if chunk_max == math.inf:
+            return math.inf
+        distance = max(distance, chunk_max)
+    return distance
+
+
+class PatternTemplate:
+    """Motif utilisateur précalculé une seule fois : points normalisés, motif rééchantillonné
+    et index spatial (KD-tree) réutilisés pour chaque contour de chaque page."""
+
+    def __init__(self, pattern):
+        self.points = np.array(pattern, dtype=np.int32).reshape((-1, 2))
+        self.normalized = self.normalized64 = self.tree = self.resampled = None
+        if not len(self.points):
+            return  # Motif vide : aucune comparaison (voir __bool__)
+        self.normalized = normalize_contour(self.points)
+        self.normalized64 = self.normalized.astype(np.float64)
+        self.tree = cKDTree(self.normalized64)
+        self.resampled = normalize_stacked(resample_contours([self.points]))[0]
+
+    def __bool__(self):
+        return len(self.points) > 0
+
+    def bounded_hausdorff_distance(self, contour, threshold):
+        """Distance de Hausdorff symétrique entre le motif normalisé et un contour normalisé si elle
+        est sous ``threshold``, ``math.inf`` dès qu'elle est prouvée supérieure ou égale au seuil."""
+        contour = np.asarray(contour, dtype=np.float64)
+        to_pattern = bounded_directed_hausdorff(self.tree, contour, threshold)
+        if to_pattern == math.inf:
+            return math.inf
+        to_contour = bounded_directed_hausdorff(cKDTree(contour), self.normalized64, threshold)
+        return max(to_pattern, to_contour)
+
+    def score_batch(self, contours):
+        """Score approché de tous les contours en une passe vectorisée : distance de Hausdorff
+        entre chaque contour rééchantillonné et normalisé et le motif rééchantillonné."""
+        stacked = normalize_stacked(resample_contours(contours))
+        diff = stacked[:, :, None, :] - self.resampled[None, None, :, :]
+        squared = np.einsum("nijk,nijk->nij", diff, diff)
+        return np.sqrt(np.maximum(squared.min(axis=2).max(axis=1), squared.min(axis=1).max(axis=1)))
+
+    def best_match(self, contours, threshold):
+        """Meilleur contour correspondant au motif parmi ``contours``.
+
+        Les contours sont classés par le score groupé ; seuls ceux dont le score approché
+        est sous ``threshold * PREFILTER_MARGIN`` sont vérifiés avec la distance exacte,
+        le seuil se resserrant à chaque meilleure correspondance trouvée.
+        Retourne (indice, distance exacte), ou (None, meilleur score approché) sans correspondance.
+        """
+        scores = self.score_batch(contours)
+        best_index, best_distance = None, threshold
+        for index in np.argsort(scores, kind="stable"):
+            if scores[index] >= threshold * PREFILTER_MARGIN:
+                break
+            distance = self.bounded_hausdorff_distance(normalize_contour(contours[index]), best_distance)
+            if distance < best_distance:
+                best_index, best_distance = int(index), distance
+        if best_index is None:
+            return None, float(scores.min())
+        return best_index, best_distance
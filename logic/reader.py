@@ -0,0 +1,58 @@
+import mmap
+import pymupdf
+
+
+class MappedPDF:
+    """PDF source ouvert depuis une projection mémoire (mmap) du fichier.
+
+    MuPDF lit directement les pages du cache du système : les process de détection qui
+    ouvrent le même fichier partagent ces pages au lieu de relire chacun le fichier.
+    Si la projection est impossible (fichier vide, système de fichiers sans mmap),
+    le document est ouvert normalement depuis son chemin.
+
+    Attention : si le fichier est tronqué ou réécrit pendant la lecture, l'accès aux pages
+    disparues lève SIGBUS et tue le process, sans exception Python. La projection est donc
+    optionnelle (``use_mmap``) et réservée aux dossiers dont les fichiers ne changent plus.
+    """
+
+    def __init__(self, path, use_mmap=False):
+        self.path = path
+        self.file = None
+        self.mapping = None
+        self.view = None
+        self.doc = None
+        if use_mmap:
+            try:
+                self.file = open(path, "rb")
+                self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self.mapping)
+                self.doc = pymupdf.open(stream=self.view, filetype="pdf")
+            except Exception:
+                self.release()
+        if self.doc is None:
+            self.doc = pymupdf.open(path)
+
+    def release(self):
+        """Libère la projection et le descripteur du fichier (le document doit être fermé)."""
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        """Ferme le document puis la projection : le fichier peut ensuite être supprimé ou déplacé."""
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+        self.release()
+
+    def __enter__(self):
+        return self.doc
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import pymupdf
+
+# Nom des segments : dérivé du fichier source pour que deux sources ne se marchent pas dessus
+OUTPUT_NAME = "{stem}_split_{index}.pdf"
+
+
+class SplitWriter:
+    """Écrit les segments d'un PDF découpé : chaque segment est copié en une seule plage de pages.
+
+    Chaque segment est enregistré dans un fichier temporaire du dossier de sortie puis publié
+    sous son nom définitif sans jamais écraser un fichier existant : plusieurs process peuvent
+    écrire dans le même dossier en même temps, sans verrou.
+    """
+
+    def __init__(self, output_dir, source_path, garbage=0, deflate=False):
+        self.output_dir = output_dir
+        self.stem = os.path.splitext(os.path.basename(source_path))[0]
+        # Options de pymupdf.Document.save (nettoyage des objets inutilisés, compression des flux)
+        self.garbage = garbage
+        self.deflate = deflate
+        self.outputs = []  # Chemins des segments écrits
+
+    def write_segment(self, doc, start, end, file_idx):
+        """Copie les pages [start, end[ de ``doc`` dans un nouveau PDF et retourne son chemin."""
+        fd, temp_path = tempfile.mkstemp(prefix=f".{self.stem}_", suffix=".tmp", dir=self.output_dir)
+        os.close(fd)
+        try:
+            new_doc = pymupdf.open()  # Nouveau document PDF
+            try:
+                # Une seule copie de plage : le graphe d'objets et les ressources partagées ne sont copiés qu'une fois
+                new_doc.insert_pdf(doc, from_page=start, to_page=end - 1)
+                new_doc.save(temp_path, garbage=self.garbage, deflate=self.deflate)
+            finally:
+                new_doc.close()
+            output_path = self.publish(temp_path, file_idx)
+        finally:
+            # Fichier temporaire restant seulement si l'écriture ou la publication a échoué
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.outputs.append(output_path)
+        return output_path
+
+    def publish(self, temp_path, file_idx):
+        """Donne au fichier temporaire complet son nom définitif, sans écraser de fichier existant.
+
+        Le nom est d'abord réservé par un lien physique vers un fichier vide (``os.link`` échoue
+        si le nom est pris : on essaie alors le suffixe suivant ``_2``, ``_3``...), puis le segment
+        complet est renommé sur ce nom. Un watcher qui surveille le dossier de sortie reçoit ainsi
+        un moved-to pour un fichier complet, et non une simple création. Sur les systèmes de fichiers
+        sans liens physiques, le nom est réservé par une création exclusive (O_EXCL).
+        """
+        name = OUTPUT_NAME.format(stem=self.stem, index=file_idx)
+        base, extension = os.path.splitext(name)
+        fd, placeholder = tempfile.mkstemp(prefix=f".{self.stem}_", suffix=".lock", dir=self.output_dir)
+        os.close(fd)
+        try:
+            attempt = 1
+            while True:
+                output_path = os.path.join(self.output_dir, name if attempt == 1 else f"{base}_{attempt}{extension}")
+                try:
+                    os.link(placeholder, output_path)
+                except FileExistsError:
+                    attempt += 1
+                    continue
+                except OSError:
+                    # Liens physiques non supportés (FAT, certains partages réseau)
+                    try:
+                        os.close(os.open(output_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    except FileExistsError:
+                        attempt += 1
+                        continue
+                os.replace(temp_path, output_path)
+                return output_path
+        finally:
+            os.remove(placeholder)
@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from ihm.main_window import PDFWatcherApp
 
@@ -17,4 +18,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Nécessaire pour les process de détection dans un exécutable figé
     main()
@@ -1,5 +1,4 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-from logic.core import PDFProcessor
 
 class PDFProcessorThread(QThread):
     """Thread pour exécuter le traitement PDF sans bloquer l'interface."""
@@ -20,6 +19,8 @@ class PDFProcessorThread(QThread):
         print(f'📄 Traitement en cours pour le watcher ID : {self.id}')
         self.progress_signal.emit("En cours")
 
+        # Import différé : OpenCV, scipy et pymupdf ne sont chargés qu'au premier traitement
+        from logic.core import PDFProcessor
         processor = PDFProcessor(self.input_dir, self.output_dir, self.id, self.debug)
         processor.process()
 
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+
+class CopyTracker:
+    """Suivi groupé de la fin de copie des fichiers entrants.
+
+    Un seul thread vérifie à intervalle régulier la taille et la date de modification de tous
+    les fichiers en attente : chaque fichier est transmis dès qu'il est stable depuis
+    ``stable_time`` secondes et lisible, sans attendre les autres. Un fichier bloqué au-delà
+    de ``max_wait`` secondes est abandonné.
+    """
+    _instance = None  # Stocke l'instance unique
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CopyTracker, cls).__new__(cls)
+            cls._instance.pending = {}
+            cls._instance.lock = threading.Condition()
+            cls._instance.thread = None
+            cls._instance.check_interval = 0.5
+        return cls._instance
+
+    def add(self, filepath, on_ready, on_timeout=None, owner=None, stable_time=2, max_wait=60):
+        """Ajoute un fichier à surveiller ; ``on_ready(filepath)`` est appelé dès que sa copie est terminée."""
+        now = time.monotonic()
+        with self.lock:
+            self.pending[filepath] = {
+                "on_ready": on_ready,
+                "on_timeout": on_timeout,
+                "owner": owner,
+                "stable_time": stable_time,
+                "deadline": now + max_wait,
+                "signature": None,
+                "stable_since": now,
+            }
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.lock.notify_all()
+
+    def cancel(self, owner):
+        """Abandonne les fichiers en attente d'un propriétaire (watcher arrêté)."""
+        with self.lock:
+            self.pending = {path: entry for path, entry in self.pending.items() if entry["owner"] is not owner}
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.pending:
+                    self.lock.wait()
+                snapshot = list(self.pending.items())
+
+            ready, expired = self.check(snapshot)
+
+            with self.lock:
+                for filepath, _ in ready + expired:
+                    self.pending.pop(filepath, None)
+            # Rappels hors verrou : un traitement lent ne bloque pas les ajouts
+            for filepath, entry in ready:
+                entry["on_ready"](filepath)
+            for filepath, entry in expired:
+                print(f"[Watcher] ⚠️ Timeout : la copie de '{os.path.basename(filepath)}' semble bloquée.")
+                if entry["on_timeout"]:
+                    entry["on_timeout"](filepath)
+            time.sleep(self.check_interval)
+
+    def check(self, snapshot):
+        """Un passage sur tous les fichiers en attente : retourne (prêts, expirés)."""
+        now = time.monotonic()
+        ready, expired = [], []
+        for filepath, entry in snapshot:
+            try:
+                stat = os.stat(filepath)
+                signature = (stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                # Le fichier n'est pas encore totalement visible
+                signature = None
+
+            if signature is None or signature != entry["signature"]:
+                entry["signature"] = signature
+                entry["stable_since"] = now
+            elif now - entry["stable_since"] >= entry["stable_time"] and self.is_readable(filepath):
+                ready.append((filepath, entry))
+                continue
+
+            if now >= entry["deadline"]:
+                expired.append((filepath, entry))
+        return ready, expired
+
+    def is_readable(self, filepath):
+        """Vérifie que le fichier peut être ouvert sans erreur."""
+        try:
+            with open(filepath, "rb"):
+                return True
+        except (PermissionError, OSError):
+            return False
@@ -1,15 +1,56 @@
-import json,os,time
+import atexit,copy,hashlib,json,os,tempfile,threading,time
 
 # Obtenir le chemin absolu du dossier du projet
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Construire le chemin absolu vers le fichier patterns.json
 PATTERN_FILE = os.path.join(BASE_DIR, "assets", "patterns.json")
 DEFAULT_PATTERN = "DEFAULT"  # Clé du pattern par défaut
+WRITE_DELAY = 0.5  # Délai (s) de regroupement des écritures de patterns.json
+
+
+def file_hash(filepath, chunk_size=1024 * 1024):
+    """Empreinte SHA-256 du contenu d'un fichier, lu par blocs."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_pdfs(directory, order="age"):
+    """Liste les PDF d'un dossier via os.scandir, triés par ancienneté ("age") ou taille ("size")."""
+    with os.scandir(directory) as entries:
+        pdfs = [(entry.path, entry.stat()) for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(".pdf")]
+    if order == "size":
+        pdfs.sort(key=lambda item: item[1].st_size)
+    elif order == "age":
+        pdfs.sort(key=lambda item: item[1].st_mtime)
+    return [path for path, _ in pdfs]
 
 
 class Tools:
-    def __init__(self):
+    """Magasin de configuration partagé par tout le process (patterns.json).
+
+    Le JSON est analysé une seule fois puis relu uniquement si sa date de modification change.
+    Les écritures sont regroupées (``WRITE_DELAY``) et atomiques : fichier temporaire puis renommage.
+    """
+    _instance = None  # Stocke l'instance unique
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Tools, cls).__new__(cls)
+            cls._instance.init_store()
+        return cls._instance
+
+    def init_store(self):
         self.pattern_file = PATTERN_FILE
+        self.lock = threading.RLock()
+        self.config = None      # Configuration analysée en mémoire
+        self.signature = None   # (mtime_ns, taille) du fichier au dernier chargement / enregistrement
+        self.dirty = False      # Modifications en mémoire pas encore écrites
+        self.timer = None
+        self.subscribers = []   # Fonctions appelées avec la nouvelle configuration à chaque modification
         # Créer le dossier assets s'il n'existe pas
         os.makedirs(os.path.dirname(self.pattern_file), exist_ok=True)
         
@@ -23,56 +64,134 @@ class Tools:
                 }
             }
             self.save_configs(default_patterns)
+            self.flush()
+        # Écriture des modifications en attente à la fermeture de l'application
+        atexit.register(self.flush)
 
-    def load_configs(self,config_id=False):
-        """Charge tous les patterns depuis le fichier JSON."""
-        if os.path.exists(self.pattern_file):
+    def file_signature(self):
+        try:
+            stat = os.stat(self.pattern_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Relit le fichier seulement s'il a changé depuis le dernier chargement."""
+        if self.dirty:
+            return  # La version en mémoire est la plus récente
+        signature = self.file_signature()
+        if signature is None:
+            self.config, self.signature = {}, None
+            return
+        if signature == self.signature and self.config is not None:
+            return
+        changed = self.config is not None
+        try:
+            with open(self.pattern_file, "r") as file:
+                self.config = json.load(file)
+        except json.JSONDecodeError:
+            print("❌ Erreur : Le fichier JSON est mal formaté.")
+            self.config = {}
+        self.signature = signature
+        if changed:
+            # Fichier modifié par un autre process (interface, daemon, édition manuelle)
+            self.notify()
+
+    def subscribe(self, callback):
+        """Enregistre ``callback(config)``, appelée après chaque modification de la configuration."""
+        with self.lock:
+            if callback not in self.subscribers:
+                self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def notify(self):
+        """Transmet une copie de la configuration courante à chaque abonné."""
+        for callback in list(self.subscribers):
             try:
-                with open(self.pattern_file, "r") as file:
-                    config = json.load(file)
-                    if config_id :
-                        return config[config_id]
-                    return config
-            except json.JSONDecodeError:
-                print("❌ Erreur : Le fichier JSON est mal formaté.")
-        return {}
+                callback(copy.deepcopy(self.config))
+            except Exception as e:
+                print(f"⚠️ Erreur lors de l'application de la nouvelle configuration : {e}")
+
+    def check_for_changes(self):
+        """Relit patterns.json s'il a été modifié par un autre process et prévient les abonnés."""
+        with self.lock:
+            self.refresh()
+
+    def load_configs(self,config_id=False):
+        """Charge tous les patterns (ou un seul avec ``config_id``) ; retourne une copie modifiable."""
+        with self.lock:
+            self.refresh()
+            if config_id :
+                return copy.deepcopy(self.config[config_id])
+            return copy.deepcopy(self.config)
 
     def save_configs(self, patterns):
-        """Enregistre les patterns en écrasant l'ancien fichier, avec un backup propre."""
-        backup_file = self.pattern_file + ".bak"
+        """Remplace tous les patterns ; l'écriture sur disque est différée et regroupée."""
+        with self.lock:
+            self.config = copy.deepcopy(patterns)
+            self.schedule_write()
+
+    def schedule_write(self):
+        """Marque la configuration comme modifiée et programme une écriture groupée."""
+        self.dirty = True
+        if self.timer is None:
+            self.timer = threading.Timer(WRITE_DELAY, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
 
-        # Si le fichier original existe, on le sauvegarde proprement
-        if os.path.exists(self.pattern_file):
+    def flush(self):
+        """Écrit immédiatement les modifications en attente (fichier temporaire puis os.replace)."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            fd, temp_path = tempfile.mkstemp(prefix=".patterns_", suffix=".tmp",
+                                             dir=os.path.dirname(self.pattern_file))
             try:
-                os.replace(self.pattern_file, backup_file)  # Remplace sans erreur si le fichier existe déjà
+                with os.fdopen(fd, "w") as file:
+                    json.dump(self.config, file, indent=4)
+                    file.flush()
+                    os.fsync(file.fileno())
+                # mkstemp crée le fichier en 0600 : on garde les droits du fichier remplacé
+                os.chmod(temp_path, self.file_mode())
+                # Remplacement atomique : le fichier reste complet même en cas de crash pendant l'écriture
+                os.replace(temp_path, self.pattern_file)
+                self.signature = self.file_signature()
+                self.dirty = False
+                print("✅ Patterns sauvegardés avec succès.")
+                self.notify()
             except Exception as e:
-                print(f"⚠️ Impossible de créer le backup : {e}")
+                print(f"❌ Erreur lors de l'enregistrement : {e}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
 
+    def file_mode(self):
+        """Droits de patterns.json, ou droits par défaut d'un nouveau fichier (0666 moins l'umask)."""
         try:
-            with open(self.pattern_file, "w") as file:
-                json.dump(patterns, file, indent=4)
-            print("✅ Patterns sauvegardés avec succès.")
-
-            # Suppression du backup après succès
-            if os.path.exists(backup_file):
-                os.remove(backup_file)
-        except Exception as e:
-            print(f"❌ Erreur lors de l'enregistrement : {e}")
-
-            # Restauration du backup uniquement si l'écriture échoue
-            if os.path.exists(backup_file):
-                os.replace(backup_file, self.pattern_file)
+            return os.stat(self.pattern_file).st_mode & 0o7777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
 
     def get_pattern(self, pattern_id):
         """Récupère un pattern par ID, sinon retourne le pattern par défaut."""
-        patterns = self.load_configs()
+        with self.lock:
+            self.refresh()
+            patterns = self.config
         pattern_id = str(pattern_id)
 
         if pattern_id in patterns and len(patterns[pattern_id]["motif"]) != 0:
-            return patterns[pattern_id]
+            return copy.deepcopy(patterns[pattern_id])
         elif DEFAULT_PATTERN in patterns and len(patterns[DEFAULT_PATTERN]["motif"]) != 0:
             print(f"⚠️ Pattern '{pattern_id}' introuvable ou vide. Utilisation du pattern par défaut.")
-            return patterns[DEFAULT_PATTERN]
+            return copy.deepcopy(patterns[DEFAULT_PATTERN])
         else:
             print(f"❌ Aucun pattern valide trouvé, ni '{pattern_id}' ni '{DEFAULT_PATTERN}'.")
             return None
@@ -82,16 +201,17 @@ class Tools:
         - Accepte un nombre dynamique de champs à mettre à jour.
         - Vérifie le type des données pour éviter les erreurs.
         """
-        patterns = self.load_configs()
-        pattern_id = str(pattern_id)
+        with self.lock:
+            self.refresh()
+            pattern_id = str(pattern_id)
 
-        # Charger l'ancien pattern ou initialiser des valeurs par défaut
-        old_pattern = patterns.get(pattern_id, {"motif":[]})
+            # Charger l'ancien pattern ou initialiser des valeurs par défaut
+            old_pattern = self.config.get(pattern_id, {"motif":[]})
 
-        # Mise à jour dynamique avec les valeurs fournies dans kwargs
-        patterns[pattern_id] = {**old_pattern, **kwargs}
+            # Mise à jour dynamique avec les valeurs fournies dans kwargs
+            self.config[pattern_id] = {**old_pattern, **copy.deepcopy(kwargs)}
 
-        self.save_configs(patterns)
+            self.schedule_write()
 
     def wait_for_copy_complete(self,filepath, stable_time=2, check_interval=1, max_wait=60):
         """
@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from watchers.journal import FileJournal, PENDING, PROCESSING, DONE, FAILED
+
+
+class JobQueue:
+    """File de traitements partagée par tous les watchers.
+
+    Les watchers ne font qu'ajouter des fichiers ; un thread de répartition les envoie à un pool
+    de process unique en respectant une limite globale (``max_workers``) et une limite par watcher
+    (``watcher.max_jobs``). La file est bornée à ``max_pending`` fichiers en attente.
+    """
+
+    def __init__(self, max_workers=None, max_pending=100):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.active = Counter()
+        self.paths = set()  # Fichiers en attente ou en traitement (un même fichier n'est soumis qu'une fois)
+        self.condition = threading.Condition()
+        self.executor = None
+        self.dispatcher = None
+        self.closed = False
+        self.journal = FileJournal()
+
+    def submit(self, watcher, file_path):
+        """Ajoute un fichier à traiter ; bloque tant que la file est pleine. Retourne False si la file
+        est fermée ou si le fichier est déjà en attente, en traitement ou traité sans modification depuis."""
+        with self.condition:
+            while len(self.pending) >= self.max_pending and not self.closed:
+                self.condition.wait()
+            if self.closed:
+                return False
+            # Un fichier peut être signalé deux fois (backlog suivi par le CopyTracker puis close-write)
+            if file_path in self.paths or self.journal.is_done_unchanged(file_path):
+                print(f"[Watcher] {os.path.basename(file_path)} déjà en file ou traité, ignoré")
+                return False
+            self.paths.add(file_path)
+            self.pending.append((watcher, file_path))
+            self.journal.record(file_path, PENDING)
+            self.update_running(watcher)
+            if self.dispatcher is None:
+                self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+                self.dispatcher.start()
+            self.condition.notify_all()
+        return True
+
+    def cancel_watcher(self, watcher_id):
+        """Retire de la file les fichiers en attente d'un watcher supprimé."""
+        with self.condition:
+            self.paths -= {file_path for watcher, file_path in self.pending if watcher.id == watcher_id}
+            self.pending = deque(job for job in self.pending if job[0].id != watcher_id)
+            self.condition.notify_all()
+
+    def next_job(self):
+        """Premier fichier en attente dont le watcher n'a pas atteint sa limite (verrou déjà pris)."""
+        if sum(self.active.values()) >= self.max_workers:
+            return None
+        for index, (watcher, file_path) in enumerate(self.pending):
+            if self.active[watcher.id] < watcher.max_jobs:
+                del self.pending[index]
+                return watcher, file_path
+        return None
+
+    def dispatch(self):
+        """Boucle de répartition des fichiers en attente vers le pool de process."""
+        while True:
+            with self.condition:
+                job = self.next_job()
+                while job is None and not self.closed:
+                    self.condition.wait()
+                    job = self.next_job()
+                if self.closed:
+                    return
+                watcher, file_path = job
+                self.active[watcher.id] += 1
+                # Cœurs que les autres fichiers n'occupent pas : un fichier seul répartit ses pages dessus
+                page_workers = 1 + max(0, self.max_workers - sum(self.active.values()) - len(self.pending))
+                if self.executor is None:
+                    # spawn : pas de fork d'un process multi-threadé (Qt, observateurs, minuteries)
+                    self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                        mp_context=multiprocessing.get_context("spawn"))
+                executor = self.executor
+                self.condition.notify_all()
+            self.journal.record(file_path, PROCESSING)
+
+            print(f"[Watcher] Copie terminée, traitement du fichier : {os.path.basename(file_path)}")
+            from logic.core import split_pdf_job  # Import différé : OpenCV / pymupdf seulement au premier traitement
+            try:
+                future = executor.submit(split_pdf_job, watcher.pattern_data, file_path, watcher.output_dir, page_workers)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self.job_done(watcher, file_path, error=e)
+                continue
+            future.add_done_callback(lambda f, w=watcher, path=file_path: self.job_done(w, path, future=f))
+
+    def job_done(self, watcher, file_path, future=None, error=None):
+        if future is not None:
+            error = future.exception()
+        if error is not None:
+            print(f"[Watcher]  Erreur lors du traitement de {os.path.basename(file_path)} : {error}")
+            self.journal.record(file_path, FAILED)
+        else:
+            outputs, source_hash = future.result()
+            self.journal.record(file_path, DONE, outputs=outputs, file_hash_value=source_hash)
+        with self.condition:
+            if isinstance(error, BrokenProcessPool):
+                # Un process du pool est mort : le pool sera recréé au prochain fichier
+                self.executor = None
+            self.active[watcher.id] -= 1
+            self.paths.discard(file_path)
+            self.update_running(watcher)
+            self.condition.notify_all()
+
+    def update_running(self, watcher):
+        """Un watcher est « en cours » tant qu'il a des fichiers en attente ou en traitement (verrou déjà pris)."""
+        watcher.running = self.active[watcher.id] > 0 or any(job[0] is watcher for job in self.pending)
+
+    def shutdown(self, wait=True):
+        """Arrête la répartition et le pool de process."""
+        with self.condition:
+            self.closed = True
+            executor = self.executor
+            self.condition.notify_all()
+        if executor is not None:
+            executor.shutdown(wait=wait)
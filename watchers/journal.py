@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from utils.tools import BASE_DIR, file_hash
+
+# Journal des fichiers traités, à côté de patterns.json
+JOURNAL_FILE = os.path.join(BASE_DIR, "assets", "journal.sqlite")
+
+PENDING = "pending"        # Détecté, en attente de traitement
+PROCESSING = "processing"  # En cours de traitement (reste dans cet état après un crash)
+DONE = "done"              # Traité, segments écrits
+FAILED = "failed"          # Erreur de traitement
+EXISTING = "existing"      # Déjà présent à la première surveillance du dossier, jamais traité
+
+
+class FileJournal:
+    """Journal SQLite des PDF entrants : chemin, taille, mtime, empreinte, état et segments produits.
+
+    Permet au redémarrage de reprendre les fichiers arrivés pendant l'arrêt ou interrompus
+    par un crash, sans jamais retraiter un fichier déjà terminé.
+    """
+    _instance = None  # Stocke l'instance unique
+
+    def __new__(cls, path=JOURNAL_FILE):
+        if cls._instance is None:
+            cls._instance = super(FileJournal, cls).__new__(cls)
+            cls._instance.lock = threading.Lock()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+                "hash TEXT, state TEXT NOT NULL, outputs TEXT, updated_at REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS directories (directory TEXT PRIMARY KEY)")
+            connection.commit()
+            cls._instance.connection = connection
+        return cls._instance
+
+    def record(self, path, state, outputs=None, file_hash_value=None):
+        """Enregistre l'état d'un fichier avec sa taille et sa date de modification actuelles."""
+        try:
+            stat = os.stat(path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size = mtime_ns = None  # Fichier source déjà supprimé après traitement
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT size, mtime_ns, hash, outputs FROM files WHERE path = ?", (path,)).fetchone()
+            if previous is not None and size is None:
+                size, mtime_ns = previous[0], previous[1]
+            if file_hash_value is None and previous is not None and (size, mtime_ns) == previous[:2]:
+                file_hash_value = previous[2]
+            if outputs is None and previous is not None:
+                outputs = json.loads(previous[3]) if previous[3] else None
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash, state, outputs, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, file_hash_value, state,
+                 json.dumps(outputs) if outputs is not None else None, time.time()))
+            self.connection.commit()
+
+    def is_completed(self, path, completed=(DONE, EXISTING)):
+        """Vrai si le fichier n'a pas à être (re)traité : déjà terminé ou présent avant la première surveillance.
+
+        Si la taille est identique mais la date de modification a changé (copie, touch...),
+        l'empreinte du contenu tranche.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, hash, state FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None or row[3] not in completed:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return True
+        if (stat.st_size, stat.st_mtime_ns) == (row[0], row[1]):
+            return True
+        if stat.st_size != row[0] or row[2] is None:
+            return False
+        if file_hash(path) != row[2]:
+            return False
+        # Même contenu : mise à jour de la date de modification pour éviter de recalculer l'empreinte
+        self.record(path, row[3], file_hash_value=row[2])
+        return True
+
+    def is_done_unchanged(self, path):
+        """Vrai si le fichier a été traité avec succès et n'a pas changé depuis (même taille et date)."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, state FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None or row[2] != DONE:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (row[0], row[1])
+
+    def knows_directory(self, directory):
+        """Vrai si le dossier a déjà été surveillé avec le journal (le marque comme connu sinon)."""
+        with self.lock:
+            known = self.connection.execute(
+                "SELECT 1 FROM directories WHERE directory = ?", (directory,)).fetchone() is not None
+            if not known:
+                self.connection.execute("INSERT INTO directories (directory) VALUES (?)", (directory,))
+                self.connection.commit()
+            return known
+
+    def backlog(self, directory, paths, include_existing=False):
+        """PDF d'un dossier à traiter au démarrage (dans l'ordre de ``paths``) : arrivés pendant
+        l'arrêt ou interrompus.
+
+        À la première surveillance d'un dossier, les fichiers présents sont marqués « existants »
+        et ne sont pas traités, comme avant l'introduction du journal, sauf avec ``include_existing``.
+        """
+        if not self.knows_directory(directory) and not include_existing:
+            for path in paths:
+                self.record(path, EXISTING)
+            return []
+        completed = (DONE,) if include_existing else (DONE, EXISTING)
+        return [path for path in paths if not self.is_completed(path, completed)]
@@ -1,51 +1,188 @@
 import os
+import queue
 import time
 import threading
-from logic.core import PDFProcessor
-from utils.tools import Tools
+from utils.copy_tracker import CopyTracker
+from watchers.journal import FileJournal, PROCESSING, DONE, FAILED
+from utils.tools import Tools, file_hash, list_pdfs
+
+try:
+    # Backend événementiel Linux (inotify) via watchdog, optionnel
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers.inotify import InotifyObserver
+except ImportError:
+    FileSystemEventHandler = object
+    InotifyObserver = None
+
+
+class PDFEventHandler(FileSystemEventHandler):
+    """Transmet les PDF écrits (close-write) ou déplacés (moved-to, y compris depuis un autre
+    dossier) dans le dossier surveillé."""
+
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def on_closed(self, event):
+        if not event.is_directory and event.src_path.lower().endswith(".pdf"):
+            self.events.put(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory and event.dest_path.lower().endswith(".pdf"):
+            self.events.put(event.dest_path)
+
 
 class Watcher:
     """Surveille un dossier et traite les PDF dès qu'ils apparaissent en mode auto."""
 
-    def __init__(self, input_dir, output_dir,id,auto_mode=False):
+    def __init__(self, input_dir, output_dir,id,auto_mode=False, job_queue=None):
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.id = id
         self.auto_mode = auto_mode
-        self.processor = PDFProcessor(input_dir, output_dir,pattern_id=id,debug=False)
+        self.pattern_data = Tools().load_configs(id) or {}
+        self._processor = None  # Créé au premier traitement (import différé d'OpenCV / pymupdf)
+        # "auto" : inotify si disponible, sinon scrutation ; "polling" force la scrutation (partages réseau...)
+        self.watch_backend = self.pattern_data.get("watch_backend", "auto")
+        self.poll_interval = self.pattern_data.get("poll_interval", 2)
+        # File partagée du WatcherManager (None : traitement dans le thread du watcher)
+        self.job_queue = job_queue
+        self.max_jobs = max(1, int(self.pattern_data.get("max_concurrent_jobs", 1)))
+        # Traiter au démarrage les PDF déjà présents et jamais traités
+        self.process_backlog = self.pattern_data.get("process_backlog", False)
         self.watching = False
         self.running = False
         self.thread = None
 
+    @property
+    def processor(self):
+        """Processeur PDF du watcher, créé au premier usage."""
+        if self._processor is None:
+            from logic.core import PDFProcessor
+            self._processor = PDFProcessor(self.input_dir, self.output_dir, pattern_id=self.id, debug=False,
+                                           pattern_data=self.pattern_data)
+        return self._processor
+
+    def reload_config(self, pattern_data):
+        """Applique une nouvelle configuration sans arrêter la surveillance ni vider la file :
+        les fichiers suivants sont traités avec le nouveau motif et la nouvelle plage de couleur."""
+        self.pattern_data = pattern_data
+        self.poll_interval = pattern_data.get("poll_interval", 2)
+        self.max_jobs = max(1, int(pattern_data.get("max_concurrent_jobs", 1)))
+        if self._processor is not None:
+            self._processor.configure(pattern_data)
+        print(f"[Watcher] 🔄 Configuration rechargée pour {self.id}")
+
     def watch(self):
         """Démarre la surveillance en continu si le mode auto est activé."""
         self.watching = True
+        # Vidage du backlog en parallèle des nouvelles arrivées
+        threading.Thread(target=self.drain_backlog, daemon=True).start()
+        if self.watch_backend != "polling" and InotifyObserver is not None:
+            try:
+                self.watch_events()
+                return
+            except OSError as e:
+                # Système de fichiers sans notifications ou limite inotify atteinte
+                print(f"[Watcher] ⚠️ Notifications indisponibles pour {self.input_dir} ({e}), passage en scrutation")
+        self.watch_polling()
+
+    def drain_backlog(self):
+        """Envoie au traitement les PDF déjà présents au démarrage, triés selon ``backlog_order`` :
+        fichiers arrivés pendant l'arrêt, interrompus par un crash, et avec ``process_backlog``
+        tous les fichiers jamais traités."""
+        pdf_paths = list_pdfs(self.input_dir, self.pattern_data.get("backlog_order", "age"))
+        backlog = FileJournal().backlog(self.input_dir, pdf_paths, include_existing=self.process_backlog)
+        if backlog:
+            print(f"[Watcher] {len(backlog)} fichier(s) en attente dans {self.input_dir}")
+        for file_path in backlog:
+            if not self.watching:
+                break
+            self.handle_new_file(file_path)
+
+    def watch_events(self):
+        """Surveillance événementielle (inotify) : réagit dès la fin d'écriture ou l'arrivée d'un fichier."""
+        events = queue.Queue()
+        # Événements complets : un fichier déplacé depuis un autre dossier (moved-to sans source)
+        # arrive en on_moved au lieu d'un on_created émis aussi à l'ouverture d'un fichier vide
+        observer = InotifyObserver(generate_full_events=True)
+        observer.schedule(PDFEventHandler(events), self.input_dir, recursive=False)
+        observer.start()
+        print(f"[Watcher] Surveillance inotify de {self.input_dir}")
+        try:
+            while self.watching:
+                try:
+                    file_paths = [events.get(timeout=0.5)]
+                except queue.Empty:
+                    continue
+                # Un fichier peut être fermé plusieurs fois : les événements en attente sont regroupés
+                while True:
+                    try:
+                        file_paths.append(events.get_nowait())
+                    except queue.Empty:
+                        break
+                for file_path in dict.fromkeys(file_paths):
+                    if not os.path.exists(file_path):
+                        continue  # Fichier déjà supprimé ou déplacé
+                    # close-write / moved-to : le fichier est complet, pas d'attente de stabilité
+                    self.handle_new_file(file_path, copy_complete=True)
+        finally:
+            observer.stop()
+            observer.join()
+
+    def watch_polling(self):
+        """Surveillance par scrutation périodique du dossier (solution de repli)."""
         seen_files = set(os.listdir(self.input_dir))
 
         while self.watching:
-            time.sleep(2)
+            time.sleep(self.poll_interval)
             current_files = set(os.listdir(self.input_dir))
             new_files = current_files - seen_files
 
             for file in new_files:
                 if file.lower().endswith(".pdf"):
-                    file_path = os.path.join(self.input_dir, file)
-                    print(f"[Watcher] Nouveau fichier détecté : {file}")
-
-                    # Attente que la copie soit complète et le fichier lisible
-                    if Tools().wait_for_copy_complete(file_path):
-                        self.running = True
-                        print(f"[Watcher] Copie terminée, traitement du fichier : {file}")
-                        try:
-                            self.processor.split_pdf(file_path, self.output_dir)
-                        except Exception as e:
-                            print(f"[Watcher]  Erreur lors du traitement de {file} : {e}")
-                        self.running = False
-                    else:
-                        print(f"[Watcher]  Le fichier {file} n'a pas pu être validé (copie incomplète ?)")
+                    self.handle_new_file(os.path.join(self.input_dir, file))
 
             seen_files = current_files
 
+    def handle_new_file(self, file_path, copy_complete=False):
+        """Prend en charge un nouveau PDF : traitement dès que sa copie est terminée."""
+        file = os.path.basename(file_path)
+        print(f"[Watcher] Nouveau fichier détecté : {file}")
+
+        if copy_complete:
+            self.process_file(file_path)
+        elif self.job_queue is not None:
+            # Suivi groupé non bloquant : les autres fichiers n'attendent pas celui-ci
+            CopyTracker().add(file_path, self.process_file, on_timeout=self.copy_failed, owner=self)
+        # Attente que la copie soit complète et le fichier lisible
+        elif Tools().wait_for_copy_complete(file_path):
+            self.process_file(file_path)
+        else:
+            self.copy_failed(file_path)
+
+    def process_file(self, file_path):
+        """Envoie un PDF complet à la file partagée, ou le traite directement sans file."""
+        file = os.path.basename(file_path)
+        if self.job_queue is not None:
+            self.job_queue.submit(self, file_path)
+            return
+        self.running = True
+        print(f"[Watcher] Copie terminée, traitement du fichier : {file}")
+        journal = FileJournal()
+        journal.record(file_path, PROCESSING)
+        try:
+            source_hash = file_hash(file_path)
+            self.processor.split_pdf(file_path, self.output_dir)
+            journal.record(file_path, DONE, outputs=self.processor.last_outputs, file_hash_value=source_hash)
+        except Exception as e:
+            print(f"[Watcher]  Erreur lors du traitement de {file} : {e}")
+            journal.record(file_path, FAILED)
+        self.running = False
+
+    def copy_failed(self, file_path):
+        print(f"[Watcher]  Le fichier {os.path.basename(file_path)} n'a pas pu être validé (copie incomplète ?)")
+
     def start(self):
         """Lance la surveillance dans un thread séparé."""
         if self.auto_mode and not self.watching:
@@ -55,3 +192,4 @@ class Watcher:
     def stop(self):
         """Arrête la surveillance."""
         self.watching = False
+        CopyTracker().cancel(self)
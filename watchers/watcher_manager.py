@@ -1,4 +1,6 @@
+from watchers.job_queue import JobQueue
 from watchers.watcher import Watcher
+from utils.tools import Tools, DEFAULT_PATTERN
 
 class WatcherManager:
     _instance = None  # Stocke l'instance unique
@@ -7,14 +9,28 @@ class WatcherManager:
         if cls._instance is None:
             cls._instance = super(WatcherManager, cls).__new__(cls)
             cls._instance.watchers = []  # Initialise une seule fois la liste des watchers
+            # File de traitements et pool de process communs à tous les watchers
+            settings = Tools().load_configs(DEFAULT_PATTERN) or {}
+            cls._instance.jobs = JobQueue(max_workers=settings.get("pool_workers"),
+                                          max_pending=settings.get("queue_size", 100))
+            # Rechargement à chaud des watchers après un recalibrage
+            Tools().subscribe(cls._instance.config_changed)
         return cls._instance
 
+    def config_changed(self, config):
+        """Transmet la configuration modifiée aux watchers concernés."""
+        for watcher in self.watchers:
+            pattern_data = config.get(watcher.id)
+            if pattern_data is not None and pattern_data != watcher.pattern_data:
+                watcher.reload_config(pattern_data)
+
     def add_watcher(self, input_dir, output_dir, watcher_id, auto):
-        watcher = Watcher(input_dir, output_dir, id=watcher_id, auto_mode=auto)
+        watcher = Watcher(input_dir, output_dir, id=watcher_id, auto_mode=auto, job_queue=self.jobs)
         self.watchers.append(watcher)
         return watcher
 
     def remove_watcher(self, watcher_id):
+        self.jobs.cancel_watcher(watcher_id)
         self.watchers = [w for w in self.watchers if w.id != watcher_id]
 
     def are_watchers_running(self):
@@ -28,3 +44,9 @@ class WatcherManager:
     def get_all_watchers(self):
         """Retourne tous les watchers."""
         return self.watchers
+
+    def shutdown(self, wait=True):
+        """Arrête tous les watchers puis le pool de traitement partagé."""
+        for watcher in self.watchers:
+            watcher.stop()
+        self.jobs.shutdown(wait=wait)